@@ -4,9 +4,7 @@ from PySide6.QtWidgets import (
     QMainWindow, QLabel, QLineEdit, QVBoxLayout,
     QWidget, QHBoxLayout, QPushButton, QFileDialog, QApplication
 )
-from PySide6.QtCore import Qt, QThread
-import qtawesome as qta
-from scanInvoice import InvoiceScanner  # make sure this file exists and exports the class
+from PySide6.QtCore import Qt, QThread, QTimer
 from PySide6.QtWidgets import QProgressBar
 from pathlib import Path
 
@@ -82,13 +80,11 @@ class GUI(QMainWindow):
         self.file_path_input = QLineEdit()
         self.horizontal_layout.addWidget(self.file_path_input)
 
-        browse_button = QPushButton("Browse")
-        browse_button.setIcon(qta.icon('fa5s.file-import'))
+        self.browse_button = browse_button = QPushButton("Browse")
         browse_button.clicked.connect(self.browse_files)
         self.horizontal_layout.addWidget(browse_button)
 
-        submit_button = QPushButton("Submit")
-        submit_button.setIcon(qta.icon('fa5s.check'))
+        self.submit_button = submit_button = QPushButton("Submit")
         submit_button.clicked.connect(self.handle_submit)
         self.horizontal_layout.addWidget(submit_button)
 
@@ -106,6 +102,21 @@ class GUI(QMainWindow):
         self.saved_location.hide()
         layout.addWidget(self.saved_location)
 
+        # Loading the icon font is slow; it happens after the first paint
+        self._icons_loaded = False
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._icons_loaded:
+            self._icons_loaded = True
+            QTimer.singleShot(0, self._load_icons)
+
+    def _load_icons(self):
+        import qtawesome as qta
+
+        self.browse_button.setIcon(qta.icon('fa5s.file-import'))
+        self.submit_button.setIcon(qta.icon('fa5s.check'))
+
     def browse_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Select PDF Files", "", "PDF Files (*.pdf)")
         if files:
@@ -131,6 +142,8 @@ class GUI(QMainWindow):
                 self.progress_bar.setValue(0)
 
 
+                from scanInvoice import InvoiceScanner
+
                 self.thread = QThread()
                 self.worker = InvoiceScanner(pdf_path)
                 self.worker.moveToThread(self.thread)
@@ -158,6 +171,15 @@ class GUI(QMainWindow):
 
 
 
+    def closeEvent(self, event):
+        # Stop queued OCR work so shared page buffers get released promptly
+        try:
+            if self.worker is not None:
+                self.worker.cancel()
+        except RuntimeError:
+            pass  # worker already deleted after finishing
+        super().closeEvent(event)
+
     def run(self):
         self.show()
 
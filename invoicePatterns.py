@@ -0,0 +1,154 @@
+# invoicePatterns.py
+import json
+import re
+from pathlib import Path
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent / "invoice_patterns.json"
+
+# Characters tesseract commonly swaps between digits and letters
+_TO_DIGIT = str.maketrans({"O": "0", "o": "0", "I": "1", "l": "1"})
+_TO_LETTER = str.maketrans({"0": "O", "1": "I"})
+
+
+_DIGITS = "0-9OoIl"
+
+
+def _ocr_tolerant(pattern: str) -> str:
+    """Widen digit/letter classes so O/0 and I/1 mix-ups still match in one pass.
+
+    `\\d` becomes [0-9OoIl] (also inside a class, e.g. [\\d-]) and every A-Z
+    range in a class also accepts 0 and 1. The pattern is walked token by
+    token, so escaped characters such as `\\\\d` (a backslash, then "d") are
+    left alone. Negated classes can't be widened this way and raise ValueError.
+    """
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            escape = pattern[i:i + 2]
+            out.append(f"[{_DIGITS}]" if escape == r"\d" else escape)
+            i += 2
+        elif c == "[":
+            end, members = _parse_class(pattern, i)
+            negated = pattern.startswith("[^", i)
+            if negated and (r"\d" in members or "A-Z" in members):
+                raise ValueError(f"Can't make a negated class OCR-tolerant: {pattern[i:end]}")
+            widened = (_DIGITS if m == r"\d" else "A-Z01" if m == "A-Z" else m for m in members)
+            out.append(("[^" if negated else "[") + "".join(widened) + "]")
+            i = end
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def _parse_class(pattern: str, start: int) -> tuple[int, list[str]]:
+    """Split the character class at pattern[start] into members (chars, escapes, ranges).
+
+    Returns (index just past the closing "]", members).
+    """
+    i = start + 1
+    if pattern.startswith("^", i):
+        i += 1
+    members = []
+    first = True
+    while i < len(pattern) and (pattern[i] != "]" or first):
+        first = False
+        member = pattern[i:i + 2] if pattern[i] == "\\" else pattern[i]
+        i += len(member)
+        # a-b range (a "-" before "]" is a literal)
+        if pattern.startswith("-", i) and i + 1 < len(pattern) and pattern[i + 1] != "]":
+            upper = pattern[i + 1:i + 3] if pattern[i + 1] == "\\" else pattern[i + 1]
+            member = f"{member}-{upper}"
+            i += 1 + len(upper)
+        members.append(member)
+    if i >= len(pattern):
+        raise ValueError(f"Unterminated character class in pattern: {pattern}")
+    return i + 1, members
+
+
+def _normalize_number(number: str) -> str:
+    """Undo O/0 and I/1 confusions per token (tokens are split on '-')."""
+    tokens = []
+    for token in number.split("-"):
+        digits = sum(c.isdigit() for c in token)
+        if digits * 2 >= len(token):
+            tokens.append(token.translate(_TO_DIGIT))
+        else:
+            tokens.append(token.translate(_TO_LETTER))
+    return "-".join(tokens)
+
+
+class InvoicePatternRegistry:
+    """Invoice-number patterns plus client keywords, each compiled into one regex.
+
+    `number_patterns` must capture the invoice number in a `(?P<number>...)`
+    group; when several match, the one starting earliest in the text wins,
+    then the one listed first. The client is detected separately from
+    `clients`, a list of (client_name, [keyword, ...]): the keyword that
+    appears first on the page decides, and pages with none go to
+    `default_client`. `anchor_patterns` (case-insensitive) mark text that
+    sits next to an invoice number, e.g. "HAWB"; a page with an anchor but
+    no readable number is worth re-rendering at a higher DPI.
+    """
+
+    def __init__(self, number_patterns, clients, default_client: str = "Unsorted", ocr_tolerant: bool = True,
+                 anchor_patterns=()):
+        self.default_client = default_client
+        self._anchor_regex = re.compile("|".join(anchor_patterns), re.IGNORECASE) if anchor_patterns else None
+        self.ocr_tolerant = ocr_tolerant
+        self._clients: list[str] = []
+
+        alternatives = []
+        for i, pattern in enumerate(number_patterns):
+            if "(?P<number>" not in pattern:
+                raise ValueError(f"Pattern has no (?P<number>...) group: {pattern}")
+            if ocr_tolerant:
+                pattern = _ocr_tolerant(pattern)
+            # Group names must be unique across the combined pattern
+            alternatives.append(pattern.replace("(?P<number>", f"(?P<n{i}>"))
+        self._number_regex = re.compile("|".join(alternatives)) if alternatives else None
+
+        keywords = []
+        for client, client_keywords in clients:
+            i = len(self._clients)
+            self._clients.append(client)
+            words = "|".join(r"\s+".join(map(re.escape, k.split())) for k in client_keywords)
+            keywords.append(f"(?P<k{i}>{words})")
+        self._client_regex = re.compile(rf"\b(?:{'|'.join(keywords)})\b", re.IGNORECASE) if keywords else None
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_CONFIG) -> "InvoicePatternRegistry":
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(
+            config["number_patterns"],
+            [(entry["name"], entry["keywords"]) for entry in config.get("clients", [])],
+            default_client=config.get("default_client", "Unsorted"),
+            ocr_tolerant=config.get("ocr_tolerant", True),
+            anchor_patterns=config.get("anchor_patterns", ()),
+        )
+
+    @property
+    def clients(self) -> list[str]:
+        return list(self._clients)
+
+    def has_anchor(self, text: str) -> bool:
+        return bool(self._anchor_regex and self._anchor_regex.search(text))
+
+    def client_for(self, text: str) -> str:
+        """The client whose keyword appears first in `text`, else default_client."""
+        m = self._client_regex.search(text) if self._client_regex else None
+        return self._clients[int(m.lastgroup[1:])] if m else self.default_client
+
+    def match(self, text: str) -> tuple[str, str] | None:
+        """Return (client, invoice_number) for the first number in `text`, or None."""
+        m = self._number_regex.search(text) if self._number_regex else None
+        if not m:
+            return None
+
+        number = next(v for k, v in m.groupdict().items() if k[0] == "n" and k[1:].isdigit() and v is not None)
+        if self.ocr_tolerant:
+            number = _normalize_number(number)
+        return self.client_for(text), number
@@ -1,9 +1,13 @@
+from __future__ import annotations
+
 import os
 import sys
+import threading
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from PySide6.QtCore import Qt, QThread, Signal, QObject, QSize
-from PySide6.QtGui import QPixmap, QIcon
+from PySide6.QtGui import QPixmap, QIcon, QImage
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QFileDialog, QProgressBar,
@@ -11,19 +15,36 @@ from PySide6.QtWidgets import (
     QSplitter, QScrollArea, QCheckBox, QButtonGroup
 )
 
-from pdf2image import convert_from_path
-from PIL.ImageQt import ImageQt
-from pypdf import PdfReader, PdfWriter
+# pdf2image / PIL / pypdf / numpy are imported where they are first used so the
+# window can come up before they load (see startup_timing.py).
+if TYPE_CHECKING:
+    from pypdf import PdfReader
 
 
 OUTPUT_BASE = Path.home() / "Downloads" / "PrimeTimeLogistics_Invoices"
 
 
+def _pil_to_qimage(img) -> QImage:
+    # Grayscale pages go to Qt as 1 byte/pixel; only colour pages use RGB
+    if img.mode == "1":
+        img = img.convert("L")
+    if img.mode == "L":
+        fmt, bytes_per_line = QImage.Format_Grayscale8, img.width
+    else:
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        fmt, bytes_per_line = QImage.Format_RGB888, img.width * 3
+    data = img.tobytes()
+    # copy() so the QImage owns its pixels once `data` goes away
+    return QImage(data, img.width, img.height, bytes_per_line, fmt).copy()
+
+
 # ---------------------------
 #render PDF to thumbnails (so UI doesn’t freeze)
 # ---------------------------
 class RenderWorker(QObject):
-    finished = Signal(list)          # list of QPixmap thumbnails
+    # QPixmap thumbnails, {duplicate_index: original_index} hash hints, indices of colour pages
+    finished = Signal(list, dict, list)
     progress = Signal(int)
     error = Signal(str)
 
@@ -34,13 +55,22 @@ class RenderWorker(QObject):
 
     def run(self):
         try:
+            from pdf2image import convert_from_path
+            from pageHash import find_duplicates
+            from pageImage import is_colour_page
+
+            # One RGB render; pages without colour are shown (and kept) in grayscale
             pages = convert_from_path(self.pdf_path, dpi=self.dpi)
+            colour = set()
             total = len(pages)
             thumbs = []
 
             for i, pil_img in enumerate(pages):
-                qimg = ImageQt(pil_img.convert("RGB"))
-                pix = QPixmap.fromImage(qimg)
+                if is_colour_page(pil_img, self.dpi):
+                    colour.add(i)
+                else:
+                    pil_img = pages[i] = pil_img.convert("L")
+                pix = QPixmap.fromImage(_pil_to_qimage(pil_img))
 
                 pix = pix.scaled(180, 240, Qt.KeepAspectRatio, Qt.SmoothTransformation)
                 thumbs.append(pix)
@@ -48,12 +78,63 @@ class RenderWorker(QObject):
                 pct = int(((i + 1) / total) * 100)
                 self.progress.emit(pct)
 
-            self.finished.emit(thumbs)
+            self.finished.emit(thumbs, find_duplicates(pages), sorted(colour))
 
         except Exception as e:
             self.error.emit(str(e))
 
 
+def write_group_pdf(reader, reader_lock, page_indices: list[int], out_pdf: Path) -> Path:
+    """Write the pages to out_pdf via a temp file + rename, so a failed write never leaves half a PDF."""
+    from pypdf import PdfWriter
+    from optimizePdf import write_pdf_atomically
+
+    writer = PdfWriter()
+    with reader_lock:
+        for i in page_indices:
+            writer.add_page(reader.pages[i])
+
+    out_pdf.parent.mkdir(parents=True, exist_ok=True)
+    return write_pdf_atomically(writer, out_pdf)
+
+
+# ---------------------------
+# export queued airway groups (so UI doesn’t freeze)
+# ---------------------------
+class ExportWorker(QObject):
+    # indices of saved jobs, failure messages, size report lines
+    finished = Signal(list, list, list)
+    progress = Signal(int)
+
+    def __init__(self, reader, reader_lock, jobs: list[tuple[list[int], Path]], optimize: bool):
+        super().__init__()
+        self.reader = reader
+        self.reader_lock = reader_lock
+        self.jobs = jobs
+        self.optimize = optimize
+
+    def run(self):
+        saved, failed, size_lines = [], [], []
+        try:
+            for n, (page_indices, out_pdf) in enumerate(self.jobs):
+                try:
+                    write_group_pdf(self.reader, self.reader_lock, page_indices, out_pdf)
+                    saved.append(n)
+                except Exception as e:
+                    failed.append(f"{out_pdf.stem}: {e}")
+                self.progress.emit(int((n + 1) / len(self.jobs) * 100))
+
+            if saved and self.optimize:
+                from optimizePdf import optimize_pdfs, report_line
+                results, errors = optimize_pdfs([self.jobs[n][1] for n in saved])
+                size_lines = [report_line(*r) for r in results]
+                failed += [f"{path.stem}: saved, but not optimized ({e})" for path, e in errors]
+        except Exception as e:
+            failed.append(f"Optimize: {e}")
+        finally:
+            self.finished.emit(saved, failed, size_lines)
+
+
 # ---------------------------
 # Main Window
 # ---------------------------
@@ -70,6 +151,10 @@ class InvoiceSorter(QMainWindow):
         # Track how many times each page has been used (0-based index -> count)
         self.page_use_counts: dict[int, int] = {}
 
+        # Near-duplicate pages found while rendering (duplicate index -> original index)
+        self.duplicates: dict[int, int] = {}
+        # Pages that contain colour; everything else is rendered in grayscale
+        self.colour_pages: set[int] = set()
 
         self.preview_zoom = 1.0
         self.preview_cache: dict[tuple[int, int], QPixmap] = {}  # (page_index, dpi) -> QPixmap
@@ -78,6 +163,11 @@ class InvoiceSorter(QMainWindow):
 
         self.selected_year = "2026"
 
+        # Batch export: groups queued this session as (year, client, airway, page indices)
+        self.pending_groups: list[tuple[str, str, str, list[int]]] = []
+        # PdfReader isn't thread-safe; writers pull pages from it one at a time
+        self.reader_lock = threading.Lock()
+
         # stacked screens
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
@@ -92,6 +182,9 @@ class InvoiceSorter(QMainWindow):
         # thread stuff
         self.thread: QThread | None = None
         self.worker: RenderWorker | None = None
+        self.export_thread: QThread | None = None
+        self.export_worker: ExportWorker | None = None
+        self.exporting_groups: list[tuple[str, str, str, list[int]]] = []
 
     # ---------------------------
     # Screen 1: Upload
@@ -116,9 +209,10 @@ class InvoiceSorter(QMainWindow):
         btn_browse.clicked.connect(self.browse_pdf)
         row.addWidget(btn_browse)
 
-        btn_load = QPushButton("Load Files")
-        btn_load.clicked.connect(self.load_pdf)
-        row.addWidget(btn_load)
+        # disabled while an export runs: loading resets the page use counts it records into
+        self.btn_load = QPushButton("Load Files")
+        self.btn_load.clicked.connect(self.load_pdf)
+        row.addWidget(self.btn_load)
 
         self.progress = QProgressBar()
         self.progress.setValue(0)
@@ -144,6 +238,10 @@ class InvoiceSorter(QMainWindow):
             self.input_path.setText(file)
 
     def load_pdf(self):
+        if self.exporting_groups:
+            QMessageBox.warning(self, "Export running", "Wait for the export to finish before loading another PDF.")
+            return
+
         path = self.input_path.text().strip()
         if not path or not os.path.isfile(path) or not path.lower().endswith(".pdf"):
             QMessageBox.warning(self, "Invalid file", "Please choose a valid PDF file.")
@@ -155,6 +253,7 @@ class InvoiceSorter(QMainWindow):
         self.progress.setValue(0)
 
         try:
+            from pypdf import PdfReader
             self.reader = PdfReader(self.pdf_path)
         except Exception as e:
             QMessageBox.critical(self, "PDF Read Error", str(e))
@@ -165,6 +264,10 @@ class InvoiceSorter(QMainWindow):
         self.preview_cache.clear()
         self.preview_zoom = 1.0
         self.page_use_counts = {}
+        self.pending_groups = []
+        self.group_list.clear()
+        self.duplicates = {}
+        self.colour_pages = set()
 
         # Start worker thread
         self.thread = QThread()
@@ -185,8 +288,10 @@ class InvoiceSorter(QMainWindow):
         self.progress.setVisible(False)
         QMessageBox.critical(self, "Render Error", msg)
 
-    def _render_done(self, thumbs: list):
+    def _render_done(self, thumbs: list, duplicates: dict, colour_pages: list):
         self.thumbnails = thumbs
+        self.duplicates = duplicates
+        self.colour_pages = set(colour_pages)
 
         self.progress.setVisible(False)
         self.status.setText(f"Loaded {len(self.thumbnails)} pages.")
@@ -229,6 +334,13 @@ class InvoiceSorter(QMainWindow):
         btn_save.clicked.connect(self.save_selected_pages)
         top_row.addWidget(btn_save)
 
+        btn_add_group = QPushButton("Add to Batch")
+        btn_add_group.clicked.connect(self.add_group)
+        top_row.addWidget(btn_add_group)
+
+        self.chk_optimize = QCheckBox("Shrink PDF (grayscale, 150 DPI)")
+        top_row.addWidget(self.chk_optimize)
+
         btn_back = QPushButton("Back to Upload")
         btn_back.clicked.connect(lambda: self.stack.setCurrentWidget(self.screen_upload))
         top_row.addWidget(btn_back)
@@ -306,12 +418,15 @@ class InvoiceSorter(QMainWindow):
         self.btn_next = QPushButton("Next")
         self.btn_zoom_out = QPushButton("Zoom -")
         self.btn_zoom_in = QPushButton("Zoom +")
+        self.chk_show_duplicates = QCheckBox("Show duplicates")
         preview_controls.addWidget(self.btn_select_all)
         preview_controls.addWidget(self.btn_prev)
         preview_controls.addWidget(self.btn_next)
         preview_controls.addSpacing(12)
         preview_controls.addWidget(self.btn_zoom_out)
         preview_controls.addWidget(self.btn_zoom_in)
+        preview_controls.addSpacing(12)
+        preview_controls.addWidget(self.chk_show_duplicates)
         preview_controls.addStretch(1)
         right_layout.addLayout(preview_controls)
 
@@ -327,6 +442,30 @@ class InvoiceSorter(QMainWindow):
 
         split.setSizes([380, 820])
 
+        # Batch row: queued airway groups, exported together
+        batch_row = QHBoxLayout()
+        outer.addLayout(batch_row)
+
+        batch_row.addWidget(QLabel("Batch:"))
+        self.group_list = QListWidget()
+        self.group_list.setFixedHeight(90)
+        batch_row.addWidget(self.group_list, 1)
+
+        batch_buttons = QVBoxLayout()
+        batch_row.addLayout(batch_buttons)
+
+        btn_remove_group = QPushButton("Remove Group")
+        btn_remove_group.clicked.connect(self.remove_selected_group)
+        batch_buttons.addWidget(btn_remove_group)
+
+        self.btn_export_groups = QPushButton("Export All Groups")
+        self.btn_export_groups.clicked.connect(self.export_all_groups)
+        batch_buttons.addWidget(self.btn_export_groups)
+
+        self.export_progress = QProgressBar()
+        self.export_progress.setVisible(False)
+        batch_buttons.addWidget(self.export_progress)
+
         # bottom status
         self.bottom_status = QLabel("")
         outer.addWidget(self.bottom_status)
@@ -338,6 +477,7 @@ class InvoiceSorter(QMainWindow):
         self.btn_next.clicked.connect(self.next_page)
         self.btn_prev.clicked.connect(self.prev_page)
         self.btn_select_all.clicked.connect(self.select_all_visible)
+        self.chk_show_duplicates.toggled.connect(self._apply_duplicate_filter)
 
         # apply default year highlight
         self._update_year_buttons()
@@ -371,6 +511,8 @@ class InvoiceSorter(QMainWindow):
         for i, pix in enumerate(self.thumbnails):
             use_count = self.page_use_counts.get(i, 0)
             label = f"Page {i + 1}  (used: {use_count})"
+            if i in self.duplicates:
+                label += f"\npossible duplicate of page {self.duplicates[i] + 1}"
 
             item = QListWidgetItem(label)
             item.setIcon(QIcon(pix))
@@ -379,12 +521,24 @@ class InvoiceSorter(QMainWindow):
             item.setData(Qt.UserRole, i)
             self.page_list.addItem(item)
 
+        self._apply_duplicate_filter(self.chk_show_duplicates.isChecked())
         self._update_bottom_status()
 
+    def _apply_duplicate_filter(self, only_duplicates: bool):
+        # Show only pages that are part of a duplicate group (copies + their originals)
+        involved = set(self.duplicates) | set(self.duplicates.values())
+        for idx in range(self.page_list.count()):
+            item = self.page_list.item(idx)
+            page_index = int(item.data(Qt.UserRole))
+            item.setHidden(only_duplicates and page_index not in involved)
+
     def _update_bottom_status(self):
         total = len(self.thumbnails)
         total_used = sum(self.page_use_counts.values())
-        self.bottom_status.setText(f"Total pages: {total} | Total page-uses recorded: {total_used}")
+        self.bottom_status.setText(
+            f"Total pages: {total} | Total page-uses recorded: {total_used} "
+            f"| Possible duplicates: {len(self.duplicates)}"
+        )
 
     def on_page_selected(self, current, previous):
         if not current:
@@ -400,15 +554,16 @@ class InvoiceSorter(QMainWindow):
             cache_key = (page_index, self.preview_dpi)
 
             if force or cache_key not in self.preview_cache:
+                from pdf2image import convert_from_path
+
                 images = convert_from_path(
                     self.pdf_path,
                     dpi=self.preview_dpi,
                     first_page=page_index + 1,
-                    last_page=page_index + 1
+                    last_page=page_index + 1,
+                    grayscale=page_index not in self.colour_pages
                 )
-                pil_img = images[0].convert("RGB")
-                qimg = ImageQt(pil_img)
-                pix = QPixmap.fromImage(qimg)
+                pix = QPixmap.fromImage(_pil_to_qimage(images[0]))
                 self.preview_cache[cache_key] = pix
 
             base_pix = self.preview_cache[cache_key]
@@ -442,7 +597,9 @@ class InvoiceSorter(QMainWindow):
 
     def select_all_visible(self):
         for idx in range(self.page_list.count()):
-            self.page_list.item(idx).setCheckState(Qt.Checked)
+            item = self.page_list.item(idx)
+            if not item.isHidden():
+                item.setCheckState(Qt.Checked)
 
     def clear_selection(self):
         for idx in range(self.page_list.count()):
@@ -472,45 +629,55 @@ class InvoiceSorter(QMainWindow):
                 return name
         return "ALG"
 
-    def save_selected_pages(self):
+    def _current_group(self) -> tuple[str, str, str, list[int]] | None:
+        """Validate the airway/client/page inputs; returns (year, client, airway, pages) or None."""
         client_folder = self._get_selected_client_folder()
         if not client_folder:
             QMessageBox.warning(self, "Missing client name", "You selected 'Other' — please type a client name.")
             self.other_input.setFocus()
-            return
+            return None
 
         airway = self.airway_input.text().strip()
         if not airway:
             QMessageBox.warning(self, "Missing airway number", "Please type the airway number.")
-            return
+            return None
 
         page_indices = self._get_checked_page_indices()
         if not page_indices:
             QMessageBox.warning(self, "No pages selected", "Check the pages that belong to this airway number.")
-            return
+            return None
 
-        client_folder = self._get_selected_client_folder()
-        year_folder = self.selected_year
+        return self.selected_year, client_folder, airway, page_indices
 
+    def _group_output_path(self, year_folder: str, client_folder: str, airway: str) -> Path:
         safe_airway = "".join(c if c.isalnum() or c in "-_." else "_" for c in airway)
 
         # NEW STRUCTURE:
         # separated_invoices / <YEAR> / <CLIENT> / <AIRWAY>.pdf
-        folder = OUTPUT_BASE / year_folder / client_folder
-        folder.mkdir(parents=True, exist_ok=True)
-        out_pdf = folder / f"{safe_airway}.pdf"
+        return OUTPUT_BASE / year_folder / client_folder / f"{safe_airway}.pdf"
+
+    def _record_page_uses(self, page_indices: list[int]):
+        # Increment usage counts (allow reuse)
+        for i in page_indices:
+            self.page_use_counts[i] = self.page_use_counts.get(i, 0) + 1
+
+    def save_selected_pages(self):
+        group = self._current_group()
+        if group is None:
+            return
+
+        year_folder, client_folder, airway, page_indices = group
+        out_pdf = self._group_output_path(year_folder, client_folder, airway)
 
         try:
-            writer = PdfWriter()
-            for i in page_indices:
-                writer.add_page(self.reader.pages[i])
+            write_group_pdf(self.reader, self.reader_lock, page_indices, out_pdf)
 
-            with open(out_pdf, "wb") as f:
-                writer.write(f)
+            size_note = ""
+            if self.chk_optimize.isChecked():
+                from optimizePdf import optimize_pdf, report_line
+                size_note = "\n" + report_line(*optimize_pdf(out_pdf))
 
-            # Increment usage counts (allow reuse)
-            for i in page_indices:
-                self.page_use_counts[i] = self.page_use_counts.get(i, 0) + 1
+            self._record_page_uses(page_indices)
 
             # refresh UI list labels
             self._populate_page_list()
@@ -519,14 +686,100 @@ class InvoiceSorter(QMainWindow):
             QMessageBox.information(
                 self,
                 "Saved",
-                f"Saved {len(page_indices)} pages to:\n{out_pdf}"
+                f"Saved {len(page_indices)} pages to:\n{out_pdf}{size_note}"
             )
 
-            self._open_folder(folder)
+            self._open_folder(out_pdf.parent)
 
         except Exception as e:
             QMessageBox.critical(self, "Save Error", str(e))
 
+    def add_group(self):
+        group = self._current_group()
+        if group is None:
+            return
+
+        year_folder, client_folder, airway, page_indices = group
+        out_pdf = self._group_output_path(year_folder, client_folder, airway)
+        if any(self._group_output_path(*g[:3]) == out_pdf for g in self.pending_groups):
+            QMessageBox.warning(self, "Duplicate airway", f"{airway} is already in the batch for {year_folder} / {client_folder}.")
+            return
+
+        self.pending_groups.append(group)
+        self.group_list.addItem(self._group_label(group))
+
+        self.clear_selection()
+        self.airway_input.clear()
+        self.airway_input.setFocus()
+
+    def _group_label(self, group: tuple[str, str, str, list[int]]) -> str:
+        year_folder, client_folder, airway, page_indices = group
+        pages_label = ", ".join(str(i + 1) for i in page_indices)
+        return f"{year_folder} / {client_folder} / {airway}  —  pages {pages_label}"
+
+    def remove_selected_group(self):
+        row = self.group_list.currentRow()
+        if row < 0:
+            return
+        self.group_list.takeItem(row)
+        del self.pending_groups[row]
+
+    def export_all_groups(self):
+        if not self.pending_groups:
+            QMessageBox.warning(self, "Empty batch", "Add at least one airway group to the batch first.")
+            return
+
+        self.exporting_groups = list(self.pending_groups)
+        jobs = [(g[3], self._group_output_path(*g[:3])) for g in self.exporting_groups]
+
+        self.btn_export_groups.setEnabled(False)
+        self.btn_load.setEnabled(False)
+        self.export_progress.setValue(0)
+        self.export_progress.setVisible(True)
+
+        self.export_thread = QThread()
+        self.export_worker = ExportWorker(self.reader, self.reader_lock, jobs, self.chk_optimize.isChecked())
+        self.export_worker.moveToThread(self.export_thread)
+
+        self.export_thread.started.connect(self.export_worker.run)
+        self.export_worker.progress.connect(self.export_progress.setValue)
+        self.export_worker.finished.connect(self._export_done)
+        self.export_worker.finished.connect(self.export_thread.quit)
+        self.export_worker.finished.connect(self.export_worker.deleteLater)
+        self.export_thread.finished.connect(self.export_thread.deleteLater)
+
+        self.export_thread.start()
+
+    def _export_done(self, saved: list, failed: list, size_lines: list):
+        self.btn_export_groups.setEnabled(True)
+        self.btn_load.setEnabled(True)
+        self.export_progress.setVisible(False)
+
+        groups = self.exporting_groups
+        self.exporting_groups = []
+
+        # Keep failed groups (and any added meanwhile) queued so they can be retried
+        saved_groups = [groups[n] for n in saved]
+        for group in saved_groups:
+            self._record_page_uses(group[3])
+        self.pending_groups = [g for g in self.pending_groups if not any(g is s for s in saved_groups)]
+        self.group_list.clear()
+        for group in self.pending_groups:
+            self.group_list.addItem(self._group_label(group))
+        self._populate_page_list()
+
+        summary = f"Exported {len(saved)} of {len(groups)} airway groups to:\n{OUTPUT_BASE}"
+        if size_lines:
+            summary += "\n\n" + "\n".join(size_lines)
+        if failed:
+            summary += "\n\nFailed (groups that weren't saved are still in the batch):\n" + "\n".join(failed)
+            QMessageBox.warning(self, "Export finished with errors", summary)
+        else:
+            QMessageBox.information(self, "Exported", summary)
+
+        if saved:
+            self._open_folder(OUTPUT_BASE)
+
     def _open_folder(self, folder: Path):
         try:
             if sys.platform.startswith("win"):
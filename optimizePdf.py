@@ -0,0 +1,197 @@
+# optimizePdf.py
+import math
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+from pypdf import PdfWriter
+
+from pageImage import to_bilevel
+
+DEFAULT_DPI = 150
+JPEG_QUALITY = 60
+
+
+def _placed_sizes(page) -> dict[int, tuple[float, float]]:
+    """Size (inches) each image XObject is drawn at on `page`, keyed by object number.
+
+    Follows q/Q/cm in the page's own content stream. Images drawn inside form
+    XObjects or inline are not found here.
+    """
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    contents = page.get_contents()
+    if xobjects is None or contents is None:
+        return {}
+    xobjects = xobjects.get_object()
+
+    ctm = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+    stack = []
+    sizes: dict[int, tuple[float, float]] = {}
+    for operands, operator in contents.operations:
+        if operator == b"q":
+            stack.append(ctm)
+        elif operator == b"Q":
+            ctm = stack.pop() if stack else ctm
+        elif operator == b"cm":
+            a, b, c, d, e, f = (float(x) for x in operands)
+            A, B, C, D, E, F = ctm
+            ctm = (a * A + b * C, a * B + b * D, c * A + d * C, c * B + d * D,
+                   e * A + f * C + E, e * B + f * D + F)
+        elif operator == b"Do" and operands[0] in xobjects:
+            ref = xobjects.raw_get(operands[0])
+            if getattr(ref, "idnum", None) is None or xobjects[operands[0]].get("/Subtype") != "/Image":
+                continue
+            # The image's unit square is mapped through the CTM
+            width_in = math.hypot(ctm[0], ctm[1]) / 72
+            height_in = math.hypot(ctm[2], ctm[3]) / 72
+            old_w, old_h = sizes.get(ref.idnum, (0.0, 0.0))
+            sizes[ref.idnum] = (max(old_w, width_in), max(old_h, height_in))
+    return sizes
+
+
+def _shrink(img, placed_width_in: float, placed_height_in: float, target_dpi: int, mode: str):
+    """Downsample/convert one image; returns None when it is already small enough."""
+    if img.mode == "1":
+        mode = "bilevel"  # never up-convert a bilevel scan
+
+    dpi = max(img.width / placed_width_in, img.height / placed_height_in)
+    scale = target_dpi / dpi if dpi > target_dpi else 1.0
+
+    wanted_mode = {"gray": "L", "bilevel": "1"}.get(mode, img.mode)
+    if scale == 1.0 and img.mode == wanted_mode:
+        return None
+
+    if scale < 1.0:
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img = img.resize(size, Image.LANCZOS)
+
+    if mode == "gray":
+        img = img.convert("L")
+    elif mode == "bilevel":
+        img = to_bilevel(img)
+    elif img.mode not in ("RGB", "L", "1"):
+        img = img.convert("RGB")
+    return img
+
+
+def optimize_pdf(path, target_dpi: int = DEFAULT_DPI, mode: str = "gray", out_path=None) -> tuple[Path, int, int]:
+    """Shrink a raster PDF; returns (output path, size before, size after) in bytes.
+
+    mode is "gray", "bilevel" or "color". Images are downsampled to target_dpi
+    at the size they are drawn on the page, shared image objects are written
+    once, and the file is replaced atomically (it is left untouched if the
+    result would not be smaller). Images whose placement can't be worked out
+    (inline, or inside form XObjects) are left as they are.
+    """
+    path = Path(path)
+    out_path = Path(out_path) if out_path else path
+    before = path.stat().st_size
+
+    writer = PdfWriter(clone_from=str(path))
+    done: set[tuple[int, int]] = set()
+    for page in writer.pages:
+        placed = _placed_sizes(page)
+
+        for image_file in page.images:
+            ref = image_file.indirect_reference
+            if ref is None or ref.idnum not in placed:
+                continue
+            key = (ref.idnum, ref.generation)
+            if key in done:
+                continue  # same XObject reused on another page
+            done.add(key)
+
+            width_in, height_in = placed[ref.idnum]
+            if width_in <= 0 or height_in <= 0:
+                continue
+            new_img = _shrink(image_file.image, width_in, height_in, target_dpi, mode)
+            if new_img is not None:
+                kwargs = {"quality": JPEG_QUALITY} if new_img.mode != "1" else {}
+                image_file.replace(new_img, **kwargs)
+
+        page.compress_content_streams()
+
+    # Identical images (e.g. repeated pages) end up as one object
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+
+    tmp_name = _write_temp(writer, out_path.parent)
+    try:
+        after = os.path.getsize(tmp_name)
+        if after < before or out_path != path:
+            os.replace(tmp_name, out_path)
+        else:
+            after = before
+            os.remove(tmp_name)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+    return out_path, before, after
+
+
+def _write_temp(writer, directory) -> str:
+    """Write `writer` to a temp file in `directory` with normal (umask) permissions."""
+    # Not mkstemp: that creates 0600. Opening with 0666 lets the OS apply the
+    # umask, as open(..., "wb") would, without reading (i.e. setting) it.
+    while True:
+        tmp_name = os.path.join(directory, f".{uuid.uuid4().hex}.pdf.tmp")
+        try:
+            fd = os.open(tmp_name, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, "wb") as f:
+            writer.write(f)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+    return tmp_name
+
+
+def write_pdf_atomically(writer, out_path) -> Path:
+    """Write `writer` to out_path via a temp file + rename, so a failed write never leaves half a PDF."""
+    out_path = Path(out_path)
+    tmp_name = _write_temp(writer, out_path.parent)
+    try:
+        os.replace(tmp_name, out_path)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+    return out_path
+
+
+def optimize_pdfs(paths, workers=None, **kwargs) -> tuple[list[tuple[Path, int, int]], list[tuple[Path, Exception]]]:
+    """Optimize several PDFs in parallel processes and print the savings per file.
+
+    Returns (results, failures): one optimize_pdf() result per file that
+    worked and (path, error) for each one that didn't.
+    """
+    paths = list(paths)
+    if not paths:
+        return [], []
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(paths)), mp_context=ctx) as pool:
+        futures = [pool.submit(optimize_pdf, p, **kwargs) for p in paths]
+
+    results, failures = [], []
+    for p, future in zip(paths, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            print(f"Error optimizing {p}: {e}")
+            failures.append((Path(p), e))
+    for out_path, before, after in results:
+        print(report_line(out_path, before, after))
+    return results, failures
+
+
+def report_line(path, before: int, after: int) -> str:
+    saved = 100 * (before - after) / before if before else 0
+    return f"🗜️ {Path(path).name}: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB (-{saved:.0f}%)"
@@ -0,0 +1,90 @@
+# pageHash.py
+import numpy as np
+from PIL import Image
+
+# 32 x 32 = 1024-bit hash; on a letter page each cell is about 1/3 inch.
+HASH_SIZE = 32
+# Max number of differing hash bits (~1.5%) for two pages to be duplicate candidates.
+NEAR_DUPLICATE_DISTANCE = 16
+
+# Pixel confirmation: pages are compared at full render resolution in 8 x 8
+# blocks. One changed digit flips dozens of pixels inside a few blocks, while
+# a true copy of the sheet differs by at most stray noise pixels, so a single
+# block with more than BLOCK_MAX_CHANGED changed pixels means "different sheet".
+CONFIRM_BLOCK = 8
+CONFIRM_PIXEL_DELTA = 96
+BLOCK_MAX_CHANGED = 1
+
+
+def page_hashes(images, hash_size: int = HASH_SIZE) -> np.ndarray:
+    """Difference-hash every page in one pass.
+
+    Each page is shrunk to a (hash_size + 1) x hash_size grayscale buffer, the
+    buffers are stacked and the row gradients are taken for the whole batch at
+    once. Returns an (n, hash_size * hash_size) bool array, one row per page.
+    """
+    if not images:
+        return np.zeros((0, hash_size * hash_size), dtype=bool)
+
+    thumbs = np.stack([
+        np.asarray(
+            img.resize((hash_size + 1, hash_size), Image.BOX, reducing_gap=2.0).convert("L"),
+            dtype=np.int16,
+        )
+        for img in images
+    ])
+    return (thumbs[:, :, 1:] > thumbs[:, :, :-1]).reshape(len(images), -1)
+
+
+def hamming_distances(hashes: np.ndarray) -> np.ndarray:
+    """Pairwise Hamming distance matrix for a batch of page hashes."""
+    bits = hashes.astype(np.int32)
+    inv = 1 - bits
+    return bits @ inv.T + inv @ bits.T
+
+
+def find_duplicates(images, max_distance: int = NEAR_DUPLICATE_DISTANCE) -> dict[int, int]:
+    """Find candidate exact and near-duplicate pages in a batch by hash only.
+
+    Returns {duplicate_index: original_index}, where original_index is always
+    the first occurrence of that sheet in the batch (0-based page indices).
+    This is a hint: pages from the same template can hash alike, so run
+    confirm_duplicates() before reusing OCR text or dropping pages.
+    """
+    hashes = page_hashes(images)
+    if len(hashes) < 2:
+        return {}
+
+    # Only look backwards: a page can only duplicate an earlier one.
+    close = np.tril(hamming_distances(hashes) <= max_distance, k=-1)
+    has_match = close.any(axis=1)
+    first_match = close.argmax(axis=1)
+
+    duplicates: dict[int, int] = {}
+    for i in np.flatnonzero(has_match):
+        j = int(first_match[i])
+        duplicates[int(i)] = duplicates.get(j, j)
+    return duplicates
+
+
+def _same_sheet(a, b) -> bool:
+    if a.size != b.size:
+        return False
+    x = np.asarray(a.convert("L"), dtype=np.int16)
+    y = np.asarray(b.convert("L"), dtype=np.int16)
+    changed = np.abs(x - y) > CONFIRM_PIXEL_DELTA
+
+    h = changed.shape[0] // CONFIRM_BLOCK * CONFIRM_BLOCK
+    w = changed.shape[1] // CONFIRM_BLOCK * CONFIRM_BLOCK
+    blocks = changed[:h, :w].reshape(h // CONFIRM_BLOCK, CONFIRM_BLOCK, w // CONFIRM_BLOCK, CONFIRM_BLOCK)
+    return int(blocks.sum(axis=(1, 3)).max(initial=0)) <= BLOCK_MAX_CHANGED
+
+
+def confirm_duplicates(images, candidates: dict[int, int]) -> dict[int, int]:
+    """Keep only the hash candidates whose pixels really match their original.
+
+    Only pixel-for-pixel copies (e.g. the same page exported twice) pass;
+    rescans of the same sheet fail this check and are simply OCR'd like any
+    other page.
+    """
+    return {d: o for d, o in candidates.items() if _same_sheet(images[d], images[o])}
@@ -0,0 +1,40 @@
+# pageImage.py
+from PIL import Image, ImageChops
+
+# Colour probe: a rendered page is shrunk to this DPI just to see if colour is present
+COLOUR_PROBE_DPI = 20
+COLOUR_TOLERANCE = 40         # channel spread (0-255) that counts as a coloured pixel
+COLOUR_MIN_FRACTION = 0.002   # ignore scanner fringing on a handful of pixels
+
+BILEVEL_THRESHOLD = 160  # 0-255; lighter pixels become white
+
+
+def has_colour(img) -> bool:
+    if img.mode in ("1", "L", "LA", "I", "F"):
+        return False
+    r, g, b = img.convert("RGB").split()[:3]
+    spread = ImageChops.lighter(ImageChops.difference(r, g), ImageChops.difference(g, b))
+    coloured = sum(spread.histogram()[COLOUR_TOLERANCE:])
+    return coloured > COLOUR_MIN_FRACTION * img.width * img.height
+
+
+def is_colour_page(img, dpi: int) -> bool:
+    """has_colour() on a COLOUR_PROBE_DPI thumbnail of a page rendered at `dpi`."""
+    factor = max(1, dpi // COLOUR_PROBE_DPI)
+    return has_colour(img.reduce(factor) if factor > 1 else img)
+
+
+def to_bilevel(img, threshold: int = BILEVEL_THRESHOLD):
+    """Packed 1-bit page. A hard threshold keeps text crisp; convert("1") would dither."""
+    if img.mode == "1":
+        return img
+    return img.convert("L").point(lambda p: 255 if p > threshold else 0, mode="1")
+
+
+def compact(img, bilevel: bool = False):
+    """Smallest representation that keeps the page's content: RGB only for colour pages."""
+    if img.mode == "1":
+        return img
+    if img.mode != "L" and has_colour(img):
+        return img.convert("RGB")
+    return to_bilevel(img) if bilevel else img.convert("L")
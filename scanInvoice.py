@@ -1,75 +1,237 @@
 # scanInvoice.py
 from PySide6.QtCore import QObject, Signal
-import pytesseract
+import csv
+import multiprocessing
+import os
 import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
 from pathlib import Path
-from pdf2image import convert_from_path
-from PIL import Image
+
+# OCR resolutions, cheapest first. A page only goes to the next tier when it
+# shows an anchor ("HAWB") but the number didn't parse, and at most
+# MAX_ESCALATIONS times.
+DPI_TIERS = (150, 200, 300)
+MAX_ESCALATIONS = 2
+# Each page is rendered once, at this resolution (pdf2image's default, which
+# the output always used); OCR tiers up to it are taken from that render and
+# only the tiers above it are rendered again.
+OUTPUT_DPI = 200
 
 
 class InvoiceScanner(QObject):
     finished = Signal()
     progress = Signal(int)
 
-    def __init__(self, pdf_path):
+    def __init__(self, pdf_path, drop_duplicates=False, workers=None, patterns_path=None, optimize=None,
+                 dpi_tiers=DPI_TIERS, bilevel=False, max_escalations=MAX_ESCALATIONS, output_dpi=OUTPUT_DPI):
         super().__init__()
         self.pdf_path = pdf_path
+        self.max_escalations = max_escalations
+        self.output_dpi = output_dpi
+        # Write black-and-white pages as packed 1-bit images instead of 8-bit grayscale
+        self.bilevel = bilevel
+        self.dpi_tiers = tuple(dpi_tiers)
+        # page index -> DPI at which the invoice number was read (None = never found)
+        self.page_tiers = {}
+        # None, or optimize_pdf() options, e.g. {"mode": "bilevel", "target_dpi": 150}
+        self.optimize = optimize
+        self.patterns_path = patterns_path
+        self.drop_duplicates = drop_duplicates
+        self.workers = workers or os.cpu_count() or 1
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _ocr_pages(self, pages, indices, patterns_path):
+        """OCR the given pages in worker processes; returns {page_index: text}.
+
+        Grayscale page pixels (rendered at output_dpi) travel through shared
+        memory, only a handle is pickled. At most 2 pages per worker are in
+        shared memory at a time; each segment is freed when its page is done.
+        Workers scale the page to each OCR tier themselves, re-render it only
+        for tiers above output_dpi, and report the tier used, which is
+        recorded in self.page_tiers.
+        Pages that fail are left out.
+        """
+        from sharedPages import SharedPages, init_ocr_worker, ocr_shared_page
+
+        texts = {}
+        if not indices:
+            return texts
+
+        # spawn, not fork: we are running inside a Qt worker thread
+        ctx = multiprocessing.get_context("spawn")
+        workers = min(self.workers, len(indices))
+        with SharedPages() as shared:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=init_ocr_worker)
+            try:
+                queue = iter(indices)
+                in_flight = {}  # future -> (page index, segment name)
+
+                def submit_more():
+                    while len(in_flight) < 2 * workers:
+                        i = next(queue, None)
+                        if i is None:
+                            return
+                        handle = shared.put(pages[i].convert("L"))
+                        future = executor.submit(
+                            ocr_shared_page,
+                            handle,
+                            self.output_dpi,
+                            self.dpi_tiers[:1 + self.max_escalations],
+                            (self.pdf_path, i + 1, str(patterns_path)),
+                        )
+                        in_flight[future] = (i, handle[0])
+
+                done = 0
+                submit_more()
+                while in_flight and not self._cancelled.is_set():
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        i, segment = in_flight.pop(future)
+                        shared.release(segment)
+                        try:
+                            texts[i], tier = future.result()
+                            self.page_tiers[i] = self.dpi_tiers[tier] if tier is not None else None
+                        except Exception as e:
+                            print(f"Error on page {i + 1}: {e}")
+
+                        done += 1
+                        self.progress.emit(int(done / len(indices) * 100))
+                    submit_more()
+            finally:
+                # Running OCR calls finish on their own; queued ones are dropped.
+                # Segments are unlinked by SharedPages on the way out either way.
+                executor.shutdown(wait=True, cancel_futures=True)
+        return texts
+
+    def _report_tiers(self, log_path: Path):
+        """Print which DPI tier read each page and append it to a CSV for tuning DPI_TIERS."""
+        counts = {}
+        for dpi in self.page_tiers.values():
+            counts[dpi] = counts.get(dpi, 0) + 1
+        summary = ", ".join(f"{dpi} DPI: {counts[dpi]}" for dpi in self.dpi_tiers if dpi in counts)
+        print(f"DPI tiers — {summary or 'no hits'}; no invoice number: {counts.get(None, 0)}")
+
+        new_file = not log_path.exists()
+        with open(log_path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["pdf", "page", "dpi"])
+            for i, dpi in sorted(self.page_tiers.items()):
+                writer.writerow([Path(self.pdf_path).name, i + 1, dpi if dpi is not None else ""])
 
     def run(self):
         try:
-            output_base = Path.home() / "Downloads" / "separated_invoices"
+            # Heavy imports live here so importing this module (gui.py) stays cheap
+            from pdf2image import convert_from_path
+            from pageHash import confirm_duplicates, find_duplicates
+            from pageImage import compact, is_colour_page
+            from invoicePatterns import DEFAULT_CONFIG, InvoicePatternRegistry
+
+            patterns_path = self.patterns_path or DEFAULT_CONFIG
+            registry = InvoicePatternRegistry.from_file(patterns_path)
+
+            # separated_invoices / <YEAR> / <CLIENT> / <INVOICE> /
+            output_base = Path.home() / "Downloads" / "separated_invoices" / str(date.today().year)
             output_base.mkdir(parents=True, exist_ok=True)
 
-            invoices = {}
-            last_used_invoice_number = None
+            invoices = {}  # invoice number -> page indices
+            invoice_clients = {}  # invoice number -> client, the first non-default one seen
+            last_used_invoice = None
 
-            pages = convert_from_path(self.pdf_path)
+            # The only full render: OCR, duplicate detection and the output all
+            # use it. Only pages that really contain colour stay RGB.
+            pages = convert_from_path(self.pdf_path, dpi=self.output_dpi)
             total_pages = len(pages)
+            colour = set()
+            for i, page in enumerate(pages):
+                if is_colour_page(page, self.output_dpi):
+                    colour.add(i)
+                else:
+                    pages[i] = page.convert("L")
+
+            # Repeated sheets / cover pages: OCR the first copy only. The hash
+            # only nominates candidates; a pixel comparison has to agree.
+            duplicates = confirm_duplicates(pages, find_duplicates(pages))
+            if duplicates:
+                print(f"Found {len(duplicates)} duplicate page(s): "
+                      + ", ".join(f"{d + 1}->{o + 1}" for d, o in duplicates.items()))
 
-            for i, page_image in enumerate(pages):
+            ocr_texts = self._ocr_pages(pages, [i for i in range(total_pages) if i not in duplicates], patterns_path)
+            if self._cancelled.is_set():
+                print("Scan cancelled.")
+                return
+            self._report_tiers(output_base.parent / "dpi_tiers.csv")
+
+            for i in range(total_pages):
                 try:
-                    text = pytesseract.image_to_string(page_image)
-                    print(f"--- Page {i + 1} ---\n{text}\n")
+                    original = duplicates.get(i)
+                    if original is not None:
+                        if original not in ocr_texts:
+                            continue
+                        text = ocr_texts[original]
+                        print(f"--- Page {i + 1} (duplicate of page {original + 1}, reusing OCR) ---")
+                    else:
+                        if i not in ocr_texts:
+                            continue
+                        text = ocr_texts[i]
+                        print(f"--- Page {i + 1} ---\n{text}\n")
 
-                    # Extract invoice number from OCR text
-                    match = re.search(r"HAWB:([A-Z]+-\d+(?:-[A-Z]+)?)P[a-zA-Z]{2,}:", text)
+                    # Extract client + invoice number from OCR text
+                    match = registry.match(text)
                     if match:
-                        invoice_num = match.group(1)
-                        last_used_invoice_number = invoice_num
-                        print(f"✅ Invoice found on page {i + 1}: {invoice_num}")
-                    elif last_used_invoice_number:
-                        invoice_num = last_used_invoice_number
+                        client, invoice_num = match
+                        last_used_invoice = invoice_num
+                        print(f"✅ Invoice found on page {i + 1}: {invoice_num} ({client})")
+                    elif last_used_invoice:
+                        client, invoice_num = registry.client_for(text), last_used_invoice
                         print(f"Using last known invoice number for page {i + 1}: {invoice_num}")
                     else:
                         print(f"Invoice number not found on page {i + 1}, and no previous invoice to use.")
                         continue
 
-                    invoices.setdefault(invoice_num, []).append((i, page_image))
+                    if original is not None and self.drop_duplicates:
+                        print(f"Dropping duplicate page {i + 1} from output.")
+                        continue
+
+                    invoices.setdefault(invoice_num, []).append(i)
+                    # One folder per invoice: a page without the client's
+                    # keyword must not split it off under default_client.
+                    if invoice_clients.get(invoice_num, registry.default_client) == registry.default_client:
+                        invoice_clients[invoice_num] = client
                 except Exception as e:
                     print(f"Error on page {i + 1}: {e}")
 
-                # Emit progress percentage
-                percent_complete = int(((i + 1) / total_pages) * 100)
-                self.progress.emit(percent_complete)
-
             # Save grouped pages
-            for invoice_num, pages in invoices.items():
+            pdf_paths = []
+            for invoice_num, page_indices in invoices.items():
+                client = invoice_clients[invoice_num]
                 safe_invoice = re.sub(r'[\\/*?:"<>|]', "_", invoice_num)  # sanitize folder name
-                folder_path = output_base / safe_invoice
+                safe_client = re.sub(r'[\\/*?:"<>|]', "_", client)
+                folder_path = output_base / safe_client / safe_invoice
                 folder_path.mkdir(parents=True, exist_ok=True)
 
-                image_paths = []
+                out_images = []
+                for i in page_indices:
+                    image = pages[i] if i in colour else compact(pages[i], bilevel=self.bilevel)
+                    image.save(folder_path / f"page_{i+1}.png")
+                    out_images.append(image)
 
-                for i, image in pages:
-                    image_path = folder_path / f"page_{i+1}.png"
-                    image.save(image_path)
-                    image_paths.append(image_path)
-
-                if image_paths:
+                if out_images:
                     pdf_output_path = folder_path / f"{safe_invoice}.pdf"
-                    pil_images = [Image.open(p).convert("RGB") for p in image_paths]
-                    pil_images[0].save(pdf_output_path, save_all=True, append_images=pil_images[1:])
+                    # Each page keeps its own mode (1-bit / gray / RGB) in the PDF
+                    out_images[0].save(pdf_output_path, save_all=True, append_images=out_images[1:],
+                                       resolution=self.output_dpi)
                     print(f"📄 Created PDF for invoice {invoice_num}: {pdf_output_path}")
+                    pdf_paths.append(pdf_output_path)
+
+            if self.optimize is not None and pdf_paths:
+                from optimizePdf import optimize_pdfs
+                optimize_pdfs(pdf_paths, workers=self.workers, **self.optimize)
 
             print("\n✅ Done separating, saving, and generating PDFs.")
         except Exception as e:
@@ -1,10 +1,12 @@
+import os
 import smtplib
 import ssl
+import tempfile
 from email.message import EmailMessage
 from email.utils import make_msgid, formatdate
 
 
-def send_email(pdf_path, sender_email, sender_pw, receiver_email,logo_path):
+def send_email(pdf_path, sender_email, sender_pw, receiver_email,logo_path, optimize=False):
     msg = EmailMessage()
     msg['Subject'] = 'Invoices from PrimeTime'
     msg['From'] = sender_email
@@ -35,9 +37,18 @@ def send_email(pdf_path, sender_email, sender_pw, receiver_email,logo_path):
     with open(logo_path, 'rb') as img:
         msg.get_payload()[1].add_related(img.read(), 'image', 'png', cid=f"<{logo_cid}>")
 
-    with open(pdf_path,'rb') as tmp:
-        file_data = tmp.read()
-        file_name = pdf_path.split('/')[-1]
+    file_name = pdf_path.split('/')[-1]
+    if optimize:
+        # Shrink a temporary copy; the archived file stays as it is
+        from optimizePdf import optimize_pdf, report_line
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            small_pdf = os.path.join(tmp_dir, file_name)
+            print(report_line(*optimize_pdf(pdf_path, out_path=small_pdf)))
+            with open(small_pdf, 'rb') as tmp:
+                file_data = tmp.read()
+    else:
+        with open(pdf_path,'rb') as tmp:
+            file_data = tmp.read()
     msg.add_attachment(file_data, maintype="application", subtype="pdf", filename=file_name)
 
     server = 'mail.primetimeservice123.com'
@@ -0,0 +1,128 @@
+# sharedPages.py
+import os
+from functools import lru_cache
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+
+class SharedPages:
+    """Rendered page pixels placed in shared memory for OCR worker processes.
+
+    Workers only receive a small (name, shape, dtype) handle per page instead
+    of a pickled PIL image. Use as a context manager: every segment created
+    here is closed and unlinked on exit, whether the scan finished, failed
+    or was cancelled.
+    """
+
+    def __init__(self):
+        self._segments: dict[str, shared_memory.SharedMemory] = {}
+
+    def put(self, image) -> tuple:
+        arr = np.asarray(image, dtype=np.uint8)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        self._segments[shm.name] = shm
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        return shm.name, arr.shape, arr.dtype.str
+
+    def release(self, name: str):
+        """Free one page's segment as soon as its OCR is done."""
+        shm = self._segments.pop(name, None)
+        if shm is None:
+            return
+        try:
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        for name in list(self._segments):
+            self.release(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def init_ocr_worker():
+    # Each worker already is one unit of parallelism; without this every
+    # tesseract process also starts an OpenMP thread per core.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # The parent owns (and unlinks) the segment. On Python < 3.13 attaching
+    # registers the name with the resource tracker too, but spawned workers
+    # share the parent's tracker, which already has it: that is a no-op, and
+    # unregistering here would drop the parent's own registration.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+@lru_cache(maxsize=None)
+def _registry(patterns_path):
+    from invoicePatterns import InvoicePatternRegistry
+    return InvoicePatternRegistry.from_file(patterns_path)
+
+
+def ocr_shared_page(handle: tuple, rendered_dpi: int, dpi_tiers: tuple, rerender: tuple | None = None
+                    ) -> tuple[str, int | None]:
+    """Worker entry point: OCR a page straight out of shared memory.
+
+    The shared page was rendered at `rendered_dpi`. Each OCR tier in
+    `dpi_tiers` below that is a downsampled copy, the tier equal to it reads
+    the shared pixels as they are, and only tiers above it re-render the page.
+    Without `rerender` the page is OCR'd once, at dpi_tiers[0] (which must
+    not be above rendered_dpi). With rerender = (pdf_path, page_number,
+    patterns_path), a page whose text has an anchor (e.g. "HAWB") but no
+    readable invoice number goes up the tiers until one matches. Follow-on
+    pages without an anchor are not retried.
+    Returns (text, index of the tier that matched or None).
+    """
+    name, shape, dtype = handle
+    shm = _attach(name)
+    page = None
+    try:
+        page = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        # Every tier that can come from the shared pixels is copied out now,
+        # so the segment can be closed (and freed by the parent) right away.
+        sources = [_resize(page, rendered_dpi, dpi) for dpi in dpi_tiers if dpi <= rendered_dpi]
+    finally:
+        del page  # the view must go before the segment can be closed
+        shm.close()
+
+    if rerender is None:
+        return pytesseract.image_to_string(sources[0]), 0
+
+    pdf_path, page_number, patterns_path = rerender
+    registry = _registry(patterns_path)
+    for tier, dpi in enumerate(dpi_tiers):
+        if tier < len(sources):
+            image = sources[tier]
+        else:
+            from pdf2image import convert_from_path
+            image = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number,
+                                      grayscale=True)[0]
+        text = pytesseract.image_to_string(image)
+        if registry.match(text):
+            return text, tier
+        if not registry.has_anchor(text):
+            return text, None
+    return text, None
+
+
+def _resize(page: np.ndarray, rendered_dpi: int, dpi: int):
+    """The shared page as an image at `dpi` (<= rendered_dpi)."""
+    image = Image.fromarray(np.array(page))  # a copy: `page` points into shared memory
+    if dpi == rendered_dpi:
+        return image
+    scale = dpi / rendered_dpi
+    return image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
@@ -0,0 +1,139 @@
+# startup_timing.py
+"""Cold-start report for the two entry points.
+
+    python startup_timing.py                      # both entry points
+    python startup_timing.py main --runs 5        # just the page sorter
+    python startup_timing.py --max-seconds 0.3    # override the per-entry-point budget
+
+Prints the slowest imports (same numbers as `python -X importtime`) and the
+median time from process launch until the main window first paints, and
+exits 1 if a median is over its budget (regression check).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# entry point name -> (module, window class)
+TARGETS = {
+    "main": ("main", "InvoiceSorter"),
+    "gui": ("gui", "GUI"),
+}
+
+READY = "WINDOW_READY"
+
+# Median time-to-first-paint in seconds (--offscreen, 9 runs) before the
+# startup work, i.e. with eager pdf2image/pytesseract/qtawesome imports.
+# After it, the same run measured main 0.179s and gui 0.168s.
+BASELINE = {"main": 0.289, "gui": 0.438}
+# Default budget: the after-numbers plus ~40% for machine noise, which still
+# fails if the eager imports come back.
+BUDGET = {"main": 0.25, "gui": 0.25}
+
+
+def import_breakdown(module: str, top: int = 15) -> list[tuple[int, int, str]]:
+    """Run `-X importtime` on a fresh interpreter; returns (self_us, cumulative_us, name) rows."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows[:top]
+
+
+def time_to_first_window(target: str, offscreen: bool) -> float:
+    env = dict(os.environ)
+    if offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--child", target],
+        cwd=HERE, env=env, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        for line in proc.stdout:
+            if line.strip() == READY:
+                return time.perf_counter() - start
+        raise RuntimeError(f"{target}: window never came up (exit code {proc.wait()})")
+    finally:
+        proc.wait()
+
+
+def _child(target: str):
+    module_name, class_name = TARGETS[target]
+    from PySide6.QtCore import QEvent, QObject, QTimer
+    from PySide6.QtWidgets import QApplication
+
+    class FirstPaint(QObject):
+        # "Window is up" = the main window receives its first paint event;
+        # work deferred until after that (e.g. icon fonts) is not counted.
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                print(READY, flush=True)
+                QTimer.singleShot(0, app.quit)
+                obj.removeEventFilter(self)
+            return False
+
+    app = QApplication(sys.argv[:1])
+    module = __import__(module_name)
+    win = getattr(module, class_name)()
+    first_paint = FirstPaint()
+    win.installEventFilter(first_paint)
+    win.show()
+    app.exec()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", help=f"entry points to time ({', '.join(TARGETS)}; default: all)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="number of imports to list")
+    parser.add_argument("--max-seconds", type=float, help="fail if median time-to-window exceeds this (default: BUDGET per entry point)")
+    parser.add_argument("--offscreen", action="store_true", help="use Qt's offscreen platform (CI)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child)
+        return
+
+    targets = args.targets or list(TARGETS)
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"unknown entry point(s): {', '.join(unknown)}")
+
+    failed = False
+    for target in targets:
+        module_name, _ = TARGETS[target]
+        print(f"=== {target}.py ===")
+        print(f"{'self [ms]':>10} {'cumul [ms]':>11}  module")
+        for self_us, cumulative_us, name in import_breakdown(module_name, args.top):
+            print(f"{self_us / 1000:>10.1f} {cumulative_us / 1000:>11.1f}  {name}")
+
+        timings = [time_to_first_window(target, args.offscreen) for _ in range(args.runs)]
+        median = statistics.median(timings)
+        print(f"Time to first window: {median:.3f}s (median of {len(timings)}, "
+              f"min {min(timings):.3f}s, max {max(timings):.3f}s)\n")
+
+        budget = args.max_seconds if args.max_seconds is not None else BUDGET[target]
+        if median > budget:
+            print(f"❌ {target}: {median:.3f}s is over the {budget:.3f}s budget (baseline {BASELINE[target]:.3f}s)")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import re
+
+import pytest
+
+from invoicePatterns import InvoicePatternRegistry, _normalize_number, _ocr_tolerant
+
+HAWB = r"HAWB:(?P<number>[A-Z]+-\d+(?:-[A-Z]+)?)P[a-zA-Z]{2,}:"
+CLIENTS = [("ALG", ["ALG"]), ("ROCKIT CARGO", ["ROCKIT CARGO"])]
+
+
+@pytest.fixture
+def registry():
+    return InvoicePatternRegistry([HAWB], CLIENTS, anchor_patterns=["HAWB"])
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ALG\nHAWB:ABC-123456Pieces:", ("ALG", "ABC-123456")),
+    ("HAWB:ABC-123456-XYPieces: ROCKIT  CARGO", ("ROCKIT CARGO", "ABC-123456-XY")),
+    ("HAWB:ABC-12O4l6Pieces:", ("Unsorted", "ABC-120416")),  # O/0, l/1 in digits
+    ("HAWB:A0C-I23456Pieces:", ("Unsorted", "AOC-123456")),  # 0/O in letters, I/1 in digits
+])
+def test_match(registry, text, expected):
+    assert registry.match(text) == expected
+
+
+def test_no_match(registry):
+    assert registry.match("HAWB: illegible") is None
+    assert registry.has_anchor("hawb: illegible")
+
+
+@pytest.mark.parametrize("number, expected", [
+    ("ABC-12O4I6", "ABC-120416"),
+    ("A0C-123456", "AOC-123456"),
+    ("AB1-O00-XY", "ABI-000-XY"),
+])
+def test_normalize_number(number, expected):
+    assert _normalize_number(number) == expected
+
+
+def test_ocr_tolerant_inside_class():
+    regex = re.compile(_ocr_tolerant(r"[\d-]+"))
+    assert regex.fullmatch("12-O4-l")
+    assert _ocr_tolerant(r"[A-Z\d]") == "[A-Z010-9OoIl]"
+
+
+def test_ocr_tolerant_leaves_escapes_alone():
+    assert _ocr_tolerant(r"\\d\[A-Z]") == r"\\d\[A-Z]"
+    assert _ocr_tolerant(r"[\]A-Z]") == r"[\]A-Z01]"
+
+
+def test_ocr_tolerant_rejects_negated_class():
+    with pytest.raises(ValueError):
+        _ocr_tolerant(r"[^\d]")
+    assert _ocr_tolerant(r"[^:]") == "[^:]"
+
+
+@pytest.mark.parametrize("text", ["HAWB: ?", "HAW8: ?", "H AWB: ?", "HAVVB ?", "hawb"])
+def test_default_anchor_survives_ocr_garbling(text):
+    assert InvoicePatternRegistry.from_file().has_anchor(text)
+
+
+def test_default_anchor_ignores_other_text():
+    assert not InvoicePatternRegistry.from_file().has_anchor("MAWB: 123 Pieces: 4")
@@ -0,0 +1,29 @@
+from PIL import Image, ImageDraw, ImageFont
+
+from pageHash import confirm_duplicates, find_duplicates
+
+
+def invoice_page(hawb: str) -> Image.Image:
+    """A templated invoice page (letter size at 100 DPI) with one field filled in."""
+    page = Image.new("L", (850, 1100), 255)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=18)
+    draw.rectangle((40, 40, 810, 140), outline=0, width=3)
+    draw.text((60, 70), "PTL LOGISTICS - COMMERCIAL INVOICE", fill=0, font=font)
+    draw.text((60, 180), f"HAWB: {hawb}", fill=0, font=font)
+    for y in range(260, 1000, 40):
+        draw.line((40, y, 810, y), fill=0, width=1)
+    return page
+
+
+def test_pages_differing_by_one_digit_are_not_duplicates():
+    pages = [invoice_page("ABC-123456"), invoice_page("ABC-123458")]
+    # The hash alone can't tell them apart...
+    assert find_duplicates(pages) == {1: 0}
+    # ...the pixel check must.
+    assert confirm_duplicates(pages, {1: 0}) == {}
+
+
+def test_identical_pages_are_confirmed():
+    pages = [invoice_page("ABC-123456"), invoice_page("ABC-654321"), invoice_page("ABC-123456")]
+    assert confirm_duplicates(pages, find_duplicates(pages)) == {2: 0}